@@ -5,6 +5,11 @@ Simulates steering wheel behavior by reading mouse scroll events
 and tapping A/D keys accordingly.
 """
 
+import ctypes
+import multiprocessing
+import os
+import signal
+import sys
 import threading
 import time
 from pynput import mouse, keyboard
@@ -12,14 +17,70 @@ from pynput import mouse, keyboard
 # Constants
 MAX_FREQUENCY = 15  # Maximum tapping frequency (15 times per second)
 MIN_FREQUENCY = 0  # Minimum frequency (no tapping)
+MAX_INTENSITY = 15  # Largest scroll intensity kept in the steering state
+SPIN_MARGIN = 0.001  # Busy-wait the last 1ms before a tap for precise timing
+SCROLL_MIN_INTERVAL = 0.002  # Apply accumulated scroll at most every 2ms
+TAPPING_RT_PRIORITY = 10  # SCHED_FIFO priority of the tapping process (Linux)
+THREAD_PRIORITY_TIME_CRITICAL = 15  # Windows thread priority for tapping
+TOGGLE_VK = 96  # VK code for numpad 0
+# Keys resolved once, so pynput doesn't convert a char on every tap
+LEFT_KEY = keyboard.KeyCode.from_char('a')
+RIGHT_KEY = keyboard.KeyCode.from_char('d')
+# Virtual-key codes of the physical A/D keys, independent of the layout
+VK_A = 0x41
+VK_D = 0x44
+INPUT_KEYBOARD = 1  # SendInput event type for keyboard input (Windows)
+KEYEVENTF_KEYUP = 0x0002  # SendInput flag for a key release (Windows)
+WM_MOUSEWHEEL = 0x020A  # Vertical wheel message in the mouse hook (Windows)
+WHEEL_DELTA = 120  # Raw wheel delta of one notch (Windows)
+
+if sys.platform == 'win32':
+    from ctypes import wintypes
+
+    # SendInput structures; MOUSEINPUT is only needed so the union,
+    # and therefore INPUT, has the size Windows expects
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = (('dx', wintypes.LONG),
+                    ('dy', wintypes.LONG),
+                    ('mouseData', wintypes.DWORD),
+                    ('dwFlags', wintypes.DWORD),
+                    ('time', wintypes.DWORD),
+                    ('dwExtraInfo', ctypes.c_size_t))
+
+    class KEYBDINPUT(ctypes.Structure):
+        _fields_ = (('wVk', wintypes.WORD),
+                    ('wScan', wintypes.WORD),
+                    ('dwFlags', wintypes.DWORD),
+                    ('time', wintypes.DWORD),
+                    ('dwExtraInfo', ctypes.c_size_t))
+
+    class INPUTUNION(ctypes.Union):
+        _fields_ = (('mi', MOUSEINPUT), ('ki', KEYBDINPUT))
+
+    class INPUT(ctypes.Structure):
+        _fields_ = (('type', wintypes.DWORD), ('union', INPUTUNION))
+
+# The tapping process is always spawned, never forked: it is started
+# from a non-main thread of a process running several threads
+# (including pynput's), and a forked child could inherit locks that
+# another thread holds at that moment
+mp_context = multiprocessing.get_context('spawn')
 
 # Global state
 enabled = False
-current_direction = None  # 'left' or 'right' or None
-scroll_intensity = 0  # Controls tapping speed
-lock = threading.Lock()
-tapping_thread = None
-stop_tapping = threading.Event()
+# Direction and intensity packed into one int shared with the tapping
+# process, read and written without a lock: sign is the direction
+# (> 0 right, < 0 left, 0 none), magnitude is the scroll intensity
+steering = mp_context.Value(ctypes.c_int, 0, lock=False)
+tapping_process = None
+tapping_stop = None  # Stop event of the current tapping process
+state_changed = mp_context.Event()  # Wakes the tapping process when idle
+stop_event = threading.Event()  # Set on Ctrl+C to shut the program down
+toggle_requested = threading.Event()  # Wakes the tapping process manager
+scroll_reset = threading.Event()  # Set on toggle to drop the scroll carry
+pending_dy = 0  # Scroll delta received but not yet applied
+pending_lock = threading.Lock()
+scroll_received = threading.Event()  # Wakes the scroll processing thread
 
 
 def calculate_tap_delay(intensity):
@@ -40,62 +101,265 @@ def calculate_tap_delay(intensity):
     return 1 / frequency
 
 
-def tap_key_continuously():
+# Tap delay for every possible intensity, so the tapping loop never
+# has to compute it
+TAP_DELAYS = tuple(calculate_tap_delay(i) for i in range(MAX_INTENSITY + 1))
+
+
+def sleep_until(deadline):
+    """
+    Block until time.perf_counter() reaches the given deadline.
+    Sleeps coarsely until SPIN_MARGIN before the deadline, then spins
+    so the wake-up is not subject to OS sleep jitter.
+    """
+    remaining = deadline - time.perf_counter() - SPIN_MARGIN
+    if remaining > 0:
+        time.sleep(remaining)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def raise_tapping_priority():
+    """
+    Raise the scheduling priority of the calling thread so OS scheduler
+    jitter doesn't shift the taps. Best effort: keeps the default
+    priority if the platform or permissions don't allow it.
+    """
+    if sys.platform == 'win32':
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(),
+                                   THREAD_PRIORITY_TIME_CRITICAL)
+    elif hasattr(os, 'sched_setscheduler'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO,
+                                  os.sched_param(TAPPING_RT_PRIORITY))
+        except PermissionError:
+            pass
+
+
+def make_tap(key, vk):
+    """
+    Return a function that taps (presses and releases) the given key.
+    On Windows both events are built once from the key's virtual-key
+    code vk and sent in a single SendInput call, bypassing pynput;
+    elsewhere pynput's Controller is used.
+    """
+    if sys.platform == 'win32':
+        user32 = ctypes.windll.user32
+        scan = user32.MapVirtualKeyW(vk, 0)
+        events = (INPUT * 2)(
+            INPUT(INPUT_KEYBOARD, INPUTUNION(ki=KEYBDINPUT(vk, scan, 0, 0, 0))),
+            INPUT(INPUT_KEYBOARD,
+                  INPUTUNION(ki=KEYBDINPUT(vk, scan, KEYEVENTF_KEYUP, 0, 0))),
+        )
+        size = ctypes.sizeof(INPUT)
+        send_input = user32.SendInput
+        
+        def tap():
+            send_input(2, events, size)
+    else:
+        keyboard_controller = keyboard.Controller()
+
+        def tap():
+            keyboard_controller.press(key)
+            keyboard_controller.release(key)
+    
+    return tap
+
+
+def tap_key_continuously(steering, state_changed, stop_tapping):
     """
     Continuously tap the appropriate key based on current direction and intensity.
+    Runs in its own process so tapping never competes with the input
+    listeners for the GIL; the shared state is passed in explicitly.
     """
-    global current_direction, scroll_intensity
+    # Ctrl+C is handled by the main process, which stops this one
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise_tapping_priority()
     
-    keyboard_controller = keyboard.Controller()
+    tap_left = make_tap(LEFT_KEY, VK_A)
+    tap_right = make_tap(RIGHT_KEY, VK_D)
+    next_tap = time.perf_counter()
+    last_tap = float('-inf')  # No tap yet
+    last_state = 0
+    delay = None
+    tap = None
     
     while not stop_tapping.is_set():
-        with lock:
-            direction = current_direction
-            intensity = scroll_intensity
+        state = steering.value
+        if state != last_state:
+            # Only look up the delay and key when the steering changes
+            delay = TAP_DELAYS[abs(state)]
+            tap = tap_right if state > 0 else tap_left
+            if delay:
+                # The new key and rate apply from the next tap, which is
+                # still at least one delay after the previous one in
+                # either direction, so MAX_FREQUENCY always holds
+                next_tap = max(time.perf_counter(), last_tap + delay)
+            last_state = state
         
-        if direction and intensity > 0:
-            delay = calculate_tap_delay(intensity)
+        if delay:
+            # Resync if we fell more than a full period behind
+            # (e.g. after a stall), instead of bursting to catch up
+            now = time.perf_counter()
+            if now - next_tap > delay:
+                next_tap = now
             
-            if delay:
-                # Tap the appropriate key
-                key_to_press = 'a' if direction == 'left' else 'd'
-                keyboard_controller.press(key_to_press)
-                keyboard_controller.release(key_to_press)
-                
-                # Wait before next tap
-                time.sleep(delay)
-            else:
-                time.sleep(0.01)  # Small sleep to prevent busy waiting
-        else:
-            time.sleep(0.01)  # Small sleep to prevent busy waiting
+            # Wait for the next tap, but wake up as soon as the steering
+            # changes so a scroll mid-period picks the key for that tap
+            remaining = next_tap - now - SPIN_MARGIN
+            if remaining > 0 and state_changed.wait(remaining):
+                state_changed.clear()
+                continue
+            sleep_until(next_tap)
+            
+            # Tap the appropriate key
+            tap()
+            last_tap = next_tap
+            
+            # Schedule the next tap on an absolute deadline so
+            # timing errors don't accumulate across taps
+            next_tap += delay
+            continue
+        
+        # Nothing to tap: block until on_scroll/on_press changes the state.
+        # The timeout only bounds how long a missed wake-up can stall a
+        # stop request; the loop re-checks stop_tapping after waking
+        state_changed.wait(timeout=1.0)
+        state_changed.clear()
+
+
+def add_pending_scroll(dy):
+    """
+    Accumulate a scroll delta and return, so the listener thread is
+    never held up; process_scroll_events applies it.
+    """
+    global pending_dy
+    
+    with pending_lock:
+        pending_dy += dy
+    scroll_received.set()
 
 
 def on_scroll(x, y, dx, dy):
     """
     Handle mouse scroll events.
+    """
+    if not enabled:
+        return
+    
+    add_pending_scroll(dy)
+
+
+def win32_event_filter(msg, data):
+    """
+    Take vertical wheel deltas straight from the Windows mouse hook.
+    pynput floors them to whole notches before calling on_scroll, so a
+    -30 delta becomes -1 while +30 becomes 0; passing the fraction of a
+    notch instead lets the scroll carry treat both directions alike.
+    Returning False stops pynput from also calling on_scroll.
+    """
+    if msg != WM_MOUSEWHEEL:
+        return True
+    
+    if enabled:
+        add_pending_scroll(ctypes.c_short(data.mouseData >> 16).value / WHEEL_DELTA)
+    return False
+
+
+def process_scroll_events():
+    """
+    Apply accumulated scroll deltas to the steering state.
+    A burst of scroll events is collapsed into a single state update,
+    and updates are spaced at least SCROLL_MIN_INTERVAL apart.
     Scroll up (dy > 0) turns right (D key)
     Scroll down (dy < 0) turns left (A key)
     """
-    global current_direction, scroll_intensity, tapping_thread
+    global pending_dy
     
-    if not enabled:
-        return
+    last_update = 0.0
+    scroll_carry = 0.0  # Fractional scroll not yet turned into a step
+    
+    while True:
+        scroll_received.wait()
+        
+        # Let events arriving soon after the last update accumulate,
+        # bounding the update rate whatever the mouse polling rate
+        remaining = last_update + SCROLL_MIN_INTERVAL - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        scroll_received.clear()
+        last_update = time.perf_counter()
+        
+        with pending_lock:
+            dy = pending_dy
+            pending_dy = 0
+        
+        if scroll_reset.is_set():
+            # Toggled since the last batch: leftover scroll from before
+            # must not eat into the first steps after re-enabling
+            scroll_reset.clear()
+            scroll_carry = 0.0
+        
+        if not enabled:
+            continue
+        
+        # Only whole steps count; truncating toward zero treats small
+        # scrolls the same in both directions and the rest carries over
+        scroll_carry += dy
+        steps = int(scroll_carry)
+        scroll_carry -= steps
+        
+        # Scroll up (steps > 0) turns right, down turns left and the
+        # scroll amount becomes the intensity; no whole step (0) keeps
+        # the current state
+        current_state = steering.value
+        new_state = max(-MAX_INTENSITY, min(MAX_INTENSITY, steps)) or current_state
+        if new_state == current_state:
+            # Nothing changed: skip the write and the cross-process wake-up
+            continue
+        steering.value = new_state
+        state_changed.set()
+
+
+def manage_tapping_process():
+    """
+    Run the tapping process only while the simulation is enabled.
+    Starting and stopping a process is slow, so it happens on this
+    thread rather than in on_press, which runs in the keyboard hook.
+    """
+    global tapping_process, tapping_stop
     
-    with lock:
-        if dy > 0:
-            # Scroll up - turn right
-            current_direction = 'right'
-            scroll_intensity = abs(dy)
-        elif dy < 0:
-            # Scroll down - turn left
-            current_direction = 'left'
-            scroll_intensity = abs(dy)
+    while True:
+        toggle_requested.wait()
+        toggle_requested.clear()
+        scroll_reset.set()
         
-        # Start tapping thread if not already running
-        if tapping_thread is None or not tapping_thread.is_alive():
-            stop_tapping.clear()
-            tapping_thread = threading.Thread(target=tap_key_continuously, daemon=True)
-            tapping_thread.start()
+        should_run = enabled
+        if should_run == (tapping_process is not None):
+            continue
+        print(f"Mouse steering {'ENABLED' if should_run else 'DISABLED'}")
+        
+        if should_run:
+            # Each process gets its own stop event, so one that is slow
+            # to exit can't be revived by the next enable
+            tapping_stop = mp_context.Event()
+            tapping_process = mp_context.Process(
+                target=tap_key_continuously,
+                args=(steering, state_changed, tapping_stop),
+                daemon=True,
+            )
+            tapping_process.start()
+        else:
+            # Reset state and shut the tapping process down. It is never
+            # terminated: it shares state_changed with this process, and
+            # killing it mid-call could leave that event's lock held.
+            # If the join times out it still exits on its next check.
+            steering.value = 0
+            tapping_stop.set()
+            state_changed.set()
+            tapping_process.join(timeout=0.2)
+            tapping_process = None
 
 
 def on_press(key):
@@ -103,21 +367,17 @@ def on_press(key):
     Handle keyboard press events.
     Numpad 0 toggles the script on/off.
     """
-    global enabled, current_direction, scroll_intensity
+    global enabled
     
-    try:
-        # Check for numpad 0
-        if hasattr(key, 'vk') and key.vk == 96:  # VK code for numpad 0
-            enabled = not enabled
-            print(f"Mouse steering {'ENABLED' if enabled else 'DISABLED'}")
-            
-            if not enabled:
-                # Reset state when disabling
-                with lock:
-                    current_direction = None
-                    scroll_intensity = 0
-    except AttributeError:
-        pass
+    # Called for every key press system-wide, so bail out with a single
+    # lookup; special keys have no vk and fall through to None
+    if getattr(key, 'vk', None) != TOGGLE_VK:
+        return
+    
+    # Runs in the keyboard hook, so only flip the flag and let
+    # manage_tapping_process do the slow work
+    enabled = not enabled
+    toggle_requested.set()
 
 
 def main():
@@ -135,22 +395,34 @@ def main():
     print()
     print("Status: DISABLED (Press Numpad 0 to enable)")
     
-    # Start listeners
-    mouse_listener = mouse.Listener(on_scroll=on_scroll)
+    # Start the worker threads and the listeners
+    threading.Thread(target=process_scroll_events, daemon=True).start()
+    threading.Thread(target=manage_tapping_process, daemon=True).start()
+    mouse_listener = mouse.Listener(on_scroll=on_scroll,
+                                    win32_event_filter=win32_event_filter)
     keyboard_listener = keyboard.Listener(on_press=on_press)
     
     mouse_listener.start()
     keyboard_listener.start()
     
-    try:
-        # Keep the program running
-        mouse_listener.join()
-        keyboard_listener.join()
-    except KeyboardInterrupt:
-        print("\nExiting...")
-        stop_tapping.set()
-        mouse_listener.stop()
-        keyboard_listener.stop()
+    # Keep the program running until Ctrl+C. The wait uses a timeout so
+    # the handler still runs where blocking waits can't be interrupted
+    # (Windows)
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    while not stop_event.wait(0.5):
+        pass
+    
+    print("\nExiting...")
+    process, stop = tapping_process, tapping_stop
+    if process is not None:
+        stop.set()
+        state_changed.set()
+    mouse_listener.stop()
+    keyboard_listener.stop()
+    mouse_listener.join(timeout=0.5)
+    keyboard_listener.join(timeout=0.5)
+    if process is not None:
+        process.join(timeout=0.5)
 
 
 if __name__ == "__main__":